@@ -3,7 +3,7 @@
 import { useState, useEffect, useRef, useCallback } from 'react'
 import { motion } from 'framer-motion'
 import OpenSeadragon from 'openseadragon'
-import { ImageData } from '@/lib/types'
+import { ImageData, TilePackIndex } from '@/lib/types'
 
 interface ImageViewerProps {
   image: ImageData
@@ -12,6 +12,39 @@ interface ImageViewerProps {
   storageBaseUrl: string
 }
 
+// Tiles uploaded with --pack-tiles (image.tilesPacked) live in one .pack
+// file per pyramid level; read each tile as a byte range of its level's
+// pack. Falls back to the plain DZI if image.idx can't be loaded.
+async function loadPackedTileSource(tilesUrl: string): Promise<string | OpenSeadragon.TileSource> {
+  const dziPath = `${tilesUrl}/image.dzi`
+  try {
+    const response = await fetch(`${tilesUrl}/image.idx`)
+    if (!response.ok) return dziPath
+    const index: TilePackIndex = await response.json()
+
+    const source = new (OpenSeadragon as any).DziTileSource(
+      index.width,
+      index.height,
+      index.tileSize,
+      index.overlap,
+      `${tilesUrl}/image_files/`,
+      index.format
+    )
+    const tileUrl = source.getTileUrl.bind(source)
+    source.getTileUrl = (level: number, x: number, y: number) =>
+      index.levels[level]
+        ? `${tilesUrl}/image_files/${level}.pack`
+        : tileUrl(level, x, y)
+    source.getTileAjaxHeaders = (level: number, x: number, y: number) => {
+      const tile = index.levels[level]?.[`${x}_${y}`]
+      return tile ? { Range: `bytes=${tile[0]}-${tile[0] + tile[1] - 1}` } : {}
+    }
+    return source
+  } catch {
+    return dziPath
+  }
+}
+
 export default function ImageViewer({ 
   image, 
   onClose, 
@@ -43,87 +76,98 @@ export default function ImageViewer({
     const dziPath = `${tilesUrl}/image.dzi`
     console.log('Loading DZI from:', dziPath)
 
-    osdRef.current = OpenSeadragon({
-      element: viewerRef.current,
-      tileSources: dziPath,
-      prefixUrl: 'https://cdnjs.cloudflare.com/ajax/libs/openseadragon/4.1.0/images/',
-      showNavigator: true,
-      navigatorPosition: 'BOTTOM_RIGHT',
-      navigatorHeight: 100,
-      navigatorWidth: 150,
-      showNavigationControl: false,
-      showZoomControl: false,
-      showHomeControl: false,
-      showFullPageControl: false,
-      showRotationControl: false,
-      animationTime: 0.3,
-      springStiffness: 10,
-      visibilityRatio: 1,
-      constrainDuringPan: true,
-      // Use image ratio instead of absolute zoom for large images
-      minZoomImageRatio: 0.8,
-      maxZoomPixelRatio: 4,
-      // Start with image filling the viewer
-      defaultZoomLevel: 0,
-      homeFillsViewer: true,
-      gestureSettingsMouse: {
-        clickToZoom: true,
-        dblClickToZoom: true,
-        scrollToZoom: true,
-      },
-      gestureSettingsTouch: {
-        pinchToZoom: true,
-        flickEnabled: true,
-      },
-      // Render immediately for faster display
-      immediateRender: true,
-    })
-
-    // Track successful load
-    osdRef.current.addHandler('open', () => {
-      console.log('OpenSeadragon: Image loaded successfully')
-      setIsLoading(false)
-      setLoadError(null)
-      // Get the initial zoom level after image loads
-      if (osdRef.current) {
-        // Force a resize to ensure proper rendering
-        setTimeout(() => {
-          if (osdRef.current && viewerRef.current) {
-            const rect = viewerRef.current.getBoundingClientRect()
-            console.log('Viewer container size:', rect.width, 'x', rect.height)
-            osdRef.current.viewport.resize()
-
-            // Set default zoom to 67% of home (fit-to-screen) zoom
-            const homeZoom = osdRef.current.viewport.getHomeZoom()
-            const targetZoom = homeZoom * 0.67
-            osdRef.current.viewport.zoomTo(targetZoom, undefined, true)
-          }
-        }, 100)
-
-        const homeZoom = osdRef.current.viewport.getHomeZoom()
-        // Store home zoom for percentage calculation
-        ;(osdRef.current as any).homeZoom = homeZoom
-        setZoomLevel(0.67) // Initial display at 67%
-        console.log('Home zoom:', homeZoom, 'Target zoom: 67%')
-      }
-    })
-
-    // Track load errors
-    osdRef.current.addHandler('open-failed', (event) => {
-      console.error('OpenSeadragon: Failed to load image', event)
-      setIsLoading(false)
-      setLoadError(`Failed to load image tiles from ${dziPath}`)
-    })
-
-    // Track zoom changes - normalize to percentage where 100% = fit to screen
-    osdRef.current.addHandler('zoom', (event) => {
-      if (event.zoom && osdRef.current) {
-        const homeZoom = (osdRef.current as any).homeZoom || osdRef.current.viewport.getHomeZoom()
-        setZoomLevel(event.zoom / homeZoom)
-      }
+    let cancelled = false
+    const tileSourceReady: Promise<string | OpenSeadragon.TileSource> = image.tilesPacked
+      ? loadPackedTileSource(tilesUrl)
+      : Promise.resolve(dziPath)
+    tileSourceReady.then((tileSource) => {
+      if (cancelled || !viewerRef.current) return
+
+      osdRef.current = OpenSeadragon({
+        element: viewerRef.current,
+        tileSources: tileSource,
+        // Packed tiles are fetched with Range headers, which needs XHR loading
+        loadTilesWithAjax: typeof tileSource !== 'string',
+        prefixUrl: 'https://cdnjs.cloudflare.com/ajax/libs/openseadragon/4.1.0/images/',
+        showNavigator: true,
+        navigatorPosition: 'BOTTOM_RIGHT',
+        navigatorHeight: 100,
+        navigatorWidth: 150,
+        showNavigationControl: false,
+        showZoomControl: false,
+        showHomeControl: false,
+        showFullPageControl: false,
+        showRotationControl: false,
+        animationTime: 0.3,
+        springStiffness: 10,
+        visibilityRatio: 1,
+        constrainDuringPan: true,
+        // Use image ratio instead of absolute zoom for large images
+        minZoomImageRatio: 0.8,
+        maxZoomPixelRatio: 4,
+        // Start with image filling the viewer
+        defaultZoomLevel: 0,
+        homeFillsViewer: true,
+        gestureSettingsMouse: {
+          clickToZoom: true,
+          dblClickToZoom: true,
+          scrollToZoom: true,
+        },
+        gestureSettingsTouch: {
+          pinchToZoom: true,
+          flickEnabled: true,
+        },
+        // Render immediately for faster display
+        immediateRender: true,
+      })
+
+      // Track successful load
+      osdRef.current.addHandler('open', () => {
+        console.log('OpenSeadragon: Image loaded successfully')
+        setIsLoading(false)
+        setLoadError(null)
+        // Get the initial zoom level after image loads
+        if (osdRef.current) {
+          // Force a resize to ensure proper rendering
+          setTimeout(() => {
+            if (osdRef.current && viewerRef.current) {
+              const rect = viewerRef.current.getBoundingClientRect()
+              console.log('Viewer container size:', rect.width, 'x', rect.height)
+              osdRef.current.viewport.resize()
+
+              // Set default zoom to 67% of home (fit-to-screen) zoom
+              const homeZoom = osdRef.current.viewport.getHomeZoom()
+              const targetZoom = homeZoom * 0.67
+              osdRef.current.viewport.zoomTo(targetZoom, undefined, true)
+            }
+          }, 100)
+
+          const homeZoom = osdRef.current.viewport.getHomeZoom()
+          // Store home zoom for percentage calculation
+          ;(osdRef.current as any).homeZoom = homeZoom
+          setZoomLevel(0.67) // Initial display at 67%
+          console.log('Home zoom:', homeZoom, 'Target zoom: 67%')
+        }
+      })
+
+      // Track load errors
+      osdRef.current.addHandler('open-failed', (event) => {
+        console.error('OpenSeadragon: Failed to load image', event)
+        setIsLoading(false)
+        setLoadError(`Failed to load image tiles from ${dziPath}`)
+      })
+
+      // Track zoom changes - normalize to percentage where 100% = fit to screen
+      osdRef.current.addHandler('zoom', (event) => {
+        if (event.zoom && osdRef.current) {
+          const homeZoom = (osdRef.current as any).homeZoom || osdRef.current.viewport.getHomeZoom()
+          setZoomLevel(event.zoom / homeZoom)
+        }
+      })
     })
 
     return () => {
+      cancelled = true
       if (osdRef.current) {
         osdRef.current.destroy()
         osdRef.current = null
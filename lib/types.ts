@@ -17,6 +17,7 @@ export interface ImageData {
   preview: string        // Medium preview for lightbox (~2000px)
   tiles: string          // Path to DZI tiles folder
   master: string         // Full resolution lossless file
+  tilesPacked?: boolean  // Tiles uploaded as per-level packs (see TilePackIndex)
   
   // Technical metadata
   camera?: string
@@ -41,6 +42,18 @@ export interface GalleryData {
   lastUpdated: string
 }
 
+// image.idx written by `upload_to_r2.py --pack-tiles`: DZI geometry plus,
+// per packed level, the [offset, length] of each "<col>_<row>" tile
+// within image_files/<level>.pack
+export interface TilePackIndex {
+  width: number
+  height: number
+  tileSize: number
+  overlap: number
+  format: string
+  levels: Record<string, Record<string, [number, number]>>
+}
+
 export interface ViewerState {
   zoom: number
   center: { x: number; y: number }
@@ -10,6 +10,14 @@ Processes high-resolution images for the web gallery:
 
 Requirements:
     pip install Pillow
+    pip install pyvips   # optional, much faster DZI tiling (needs libvips)
+    pip install PyTurboJPEG   # optional, faster JPEG tiles without pyvips
+    pip install orjson   # optional, faster gallery.json writing
+
+    For 2-4x faster resizing and encoding, replace Pillow with the
+    API-compatible Pillow-SIMD build (compiled with AVX2):
+        pip uninstall Pillow
+        CC="cc -mavx2" pip install -U --force-reinstall pillow-simd
 
 Usage:
     python process_images.py --input ./lightroom_exports --output ./public
@@ -26,19 +34,46 @@ import hashlib
 import argparse
 import shutil
 import math
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable
 
 try:
     from PIL import Image, ExifTags
-    # Increase limit for high-resolution images (up to 200MP)
-    Image.MAX_IMAGE_PIXELS = 200000000
+    # Inputs are our own exports, not untrusted uploads: disable the
+    # decompression bomb check so masters above 200MP open as well
+    Image.MAX_IMAGE_PIXELS = None
 except ImportError as e:
     print(f"Missing dependency: {e}")
     print("Install required packages: pip install Pillow")
     sys.exit(1)
 
+# pyvips is optional: when available, DZI tiles are generated by libvips
+# dzsave, otherwise we fall back to the pure Pillow implementation below.
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+# orjson is optional: a faster drop-in for writing the gallery manifest
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# PyTurboJPEG is optional: when available, the Pillow tiler encodes JPEG
+# tiles through libjpeg-turbo's TurboJPEG API instead of Image.save.
+try:
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+
 # Configuration
 THUMBNAIL_SIZE = 800      # Max dimension for gallery thumbnails
 PREVIEW_SIZE = 2400       # Max dimension for lightbox preview
@@ -47,18 +82,45 @@ TILE_OVERLAP = 1          # DZI tile overlap
 JPEG_QUALITY = 92         # Quality for previews (visually lossless)
 WEBP_QUALITY = 90         # Quality for thumbnails
 TILE_QUALITY = 85         # Quality for tiles
+TILE_FORMAT = 'webp'      # DZI tile format ('webp' or 'jpg')
 
 SUPPORTED_FORMATS = {'.tiff', '.tif', '.jpg', '.jpeg', '.png', '.heic', '.heif'}
 
+# EXIF tag IDs read by extract_metadata
+TAG_MAKE = ExifTags.Base.Make
+TAG_MODEL = ExifTags.Base.Model
+TAG_LENS_MODEL = ExifTags.Base.LensModel
+TAG_FOCAL_LENGTH = ExifTags.Base.FocalLength
+TAG_F_NUMBER = ExifTags.Base.FNumber
+TAG_EXPOSURE_TIME = ExifTags.Base.ExposureTime
+TAG_ISO = ExifTags.Base.ISOSpeedRatings
+TAG_DATE_TIME_ORIGINAL = ExifTags.Base.DateTimeOriginal
+
+
+def iter_images(root: Path):
+    """Yield supported image files under root in a single directory walk."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                # DirEntry caches the type from the directory listing,
+                # so these checks don't need a stat() per file
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUPPORTED_FORMATS:
+                    yield Path(entry.path)
+
 
 class DeepZoomGenerator:
-    """Pure Python Deep Zoom Image generator using Pillow."""
+    """Deep Zoom Image generator using libvips dzsave, or Pillow as a fallback."""
 
-    def __init__(self, tile_size=254, overlap=1, tile_format='jpg', quality=85):
+    def __init__(self, tile_size=254, overlap=1, tile_format='jpg', quality=85, threads=None):
         self.tile_size = tile_size
         self.overlap = overlap
         self.tile_format = tile_format
         self.quality = quality
+        # Tile encode threads for the Pillow fallback
+        self.threads = threads or os.cpu_count()
 
     def get_num_levels(self, width, height):
         """Calculate number of levels in the pyramid."""
@@ -79,13 +141,52 @@ class DeepZoomGenerator:
         rows = int(math.ceil(level_height / self.tile_size))
         return cols, rows
 
-    def create_tiles(self, image_path: Path, output_dir: Path) -> Dict[str, Any]:
-        """Create DZI tiles from an image."""
-        # Open image
-        img = Image.open(image_path)
-        if img.mode in ('RGBA', 'P'):
+    def create_tiles(self, img: Image.Image, output_dir: Path) -> Dict[str, Any]:
+        """Create DZI tiles from an already decoded image with Pillow.
+
+        The caller keeps ownership of ``img``; it is not modified or closed.
+        """
+        if img.mode not in ('RGB', 'L'):
             img = img.convert('RGB')
+        return self._create_tiles_pillow(img, output_dir)
+
+    def create_tiles_from_file(self, image_path: Path, output_dir: Path) -> Dict[str, Any]:
+        """Create DZI tiles with a single streaming libvips dzsave call.
+
+        libvips reads the master sequentially from disk, so the pyramid is
+        built without a second full-resolution copy in memory.
+        """
+        vips_img = pyvips.Image.new_from_file(str(image_path), access='sequential')
+        if vips_img.hasalpha():
+            vips_img = vips_img.flatten()
+        if vips_img.format != 'uchar':
+            # 16-bit masters: scale to 8 bits rather than clip
+            vips_img = vips_img.colourspace('srgb')
+        width, height = vips_img.width, vips_img.height
+
+        # Writes image.dzi and image_files/<level>/<col>_<row>.<format>
+        if self.tile_format == 'webp':
+            suffix = f'.webp[Q={self.quality},effort=4,strip]'
+        else:
+            suffix = f'.{self.tile_format}[Q={self.quality},strip]'
+        vips_img.dzsave(
+            str(output_dir / 'image'),
+            tile_size=self.tile_size,
+            overlap=self.overlap,
+            suffix=suffix,
+            layout='dz',
+            depth='onepixel'
+        )
+
+        return {
+            'width': width,
+            'height': height,
+            'num_levels': self.get_num_levels(width, height),
+            'dzi_path': str(output_dir / 'image.dzi')
+        }
 
+    def _create_tiles_pillow(self, img: Image.Image, output_dir: Path) -> Dict[str, Any]:
+        """Create DZI tiles level by level with Pillow."""
         width, height = img.size
         num_levels = self.get_num_levels(width, height)
 
@@ -93,48 +194,56 @@ class DeepZoomGenerator:
         tiles_dir = output_dir / 'image_files'
         tiles_dir.mkdir(parents=True, exist_ok=True)
 
-        # Generate tiles for each level
-        for level in range(num_levels):
-            level_width, level_height = self.get_level_dimensions(width, height, level, num_levels)
-
-            # Create level directory
-            level_dir = tiles_dir / str(level)
-            level_dir.mkdir(exist_ok=True)
-
-            # Resize image for this level
-            if level == num_levels - 1:
-                # Full resolution level
-                level_img = img.copy()
-            else:
-                level_img = img.resize((level_width, level_height), Image.Resampling.LANCZOS)
-
-            # Generate tiles
-            cols, rows = self.get_tile_count(level_width, level_height)
-
-            for col in range(cols):
-                for row in range(rows):
-                    # Calculate tile bounds with overlap
-                    x = col * self.tile_size
-                    y = row * self.tile_size
-
-                    # Add overlap (except at edges)
-                    x1 = max(0, x - self.overlap) if col > 0 else 0
-                    y1 = max(0, y - self.overlap) if row > 0 else 0
-                    x2 = min(level_width, x + self.tile_size + self.overlap)
-                    y2 = min(level_height, y + self.tile_size + self.overlap)
-
-                    # Extract tile
-                    tile = level_img.crop((x1, y1, x2, y2))
-
-                    # Save tile
-                    tile_path = level_dir / f'{col}_{row}.{self.tile_format}'
-                    if self.tile_format == 'jpg':
-                        tile.save(tile_path, 'JPEG', quality=self.quality, optimize=True)
-                    elif self.tile_format == 'webp':
-                        tile.save(tile_path, 'WEBP', quality=self.quality)
-                    else:
-                        tile.save(tile_path)
-
+        # Tile crops and encodes run on a thread pool; Pillow releases the
+        # GIL while encoding, so they scale across cores.
+        with ThreadPoolExecutor(max_workers=self.threads) as tile_pool:
+            # Generate tiles for each level, from full resolution down. Each
+            # level is made by halving the one above it rather than resizing
+            # the full image again.
+            level_img = img
+            for level in reversed(range(num_levels)):
+                level_width, level_height = self.get_level_dimensions(width, height, level, num_levels)
+
+                # Create level directory
+                level_dir = tiles_dir / str(level)
+                level_dir.mkdir(exist_ok=True)
+
+                # Downsample the previous level for this one
+                if level != num_levels - 1:
+                    prev_img = level_img
+                    level_img = prev_img.reduce(2)
+                    if level_img.size != (level_width, level_height):
+                        level_img = level_img.resize((level_width, level_height), Image.Resampling.BILINEAR)
+                    if prev_img is not img:
+                        prev_img.close()
+
+                # Generate tiles
+                cols, rows = self.get_tile_count(level_width, level_height)
+                futures = []
+
+                for col in range(cols):
+                    for row in range(rows):
+                        # Calculate tile bounds with overlap
+                        x = col * self.tile_size
+                        y = row * self.tile_size
+
+                        # Add overlap (except at edges)
+                        x1 = max(0, x - self.overlap) if col > 0 else 0
+                        y1 = max(0, y - self.overlap) if row > 0 else 0
+                        x2 = min(level_width, x + self.tile_size + self.overlap)
+                        y2 = min(level_height, y + self.tile_size + self.overlap)
+
+                        # Extract and save tile
+                        tile_path = level_dir / f'{col}_{row}.{self.tile_format}'
+                        futures.append(tile_pool.submit(
+                            self._save_tile, level_img, (x1, y1, x2, y2), tile_path
+                        ))
+
+                # This level must be fully written before it is halved and closed
+                for future in futures:
+                    future.result()
+
+        if level_img is not img:
             level_img.close()
 
         # Create DZI descriptor file
@@ -150,8 +259,6 @@ class DeepZoomGenerator:
         with open(dzi_path, 'w') as f:
             f.write(dzi_content)
 
-        img.close()
-
         return {
             'width': width,
             'height': height,
@@ -159,12 +266,39 @@ class DeepZoomGenerator:
             'dzi_path': str(dzi_path)
         }
 
+    def _save_tile(self, level_img: Image.Image, box: tuple, tile_path: Path) -> None:
+        """Crop a single tile out of a pyramid level and encode it."""
+        # Small levels fit in one tile; encode those without a copy
+        if box == (0, 0) + level_img.size:
+            tile = level_img
+        else:
+            tile = level_img.crop(box)
+        if self.tile_format == 'jpg' and turbo_jpeg is not None and tile.mode == 'RGB':
+            with open(tile_path, 'wb') as f:
+                f.write(turbo_jpeg.encode(
+                    np.asarray(tile),
+                    quality=self.quality,
+                    pixel_format=TJPF_RGB,
+                    jpeg_subsample=TJSAMP_420
+                ))
+        elif self.tile_format == 'jpg':
+            tile.save(tile_path, 'JPEG', quality=self.quality)
+        elif self.tile_format == 'webp':
+            # method=4 is the speed/size sweet spot; 6 is 2-3x slower
+            tile.save(tile_path, 'WEBP', quality=self.quality, method=4)
+        else:
+            tile.save(tile_path)
+        if tile is not level_img:
+            tile.close()
+
 
 class ImageProcessor:
-    def __init__(self, input_dir: Path, output_dir: Path, storage_url: str = ''):
+    def __init__(self, input_dir: Path, output_dir: Path, storage_url: str = '',
+                 tile_format: str = TILE_FORMAT, tile_threads: Optional[int] = None):
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.storage_url = storage_url.rstrip('/')
+        self.tile_format = tile_format
 
         # Output subdirectories
         self.thumbnails_dir = output_dir / 'thumbnails'
@@ -180,8 +314,9 @@ class ImageProcessor:
         self.dzi_generator = DeepZoomGenerator(
             tile_size=TILE_SIZE,
             overlap=TILE_OVERLAP,
-            tile_format='jpg',
-            quality=TILE_QUALITY
+            tile_format=tile_format,
+            quality=TILE_QUALITY,
+            threads=tile_threads
         )
 
         self.gallery_data = {
@@ -194,10 +329,39 @@ class ImageProcessor:
             'lastUpdated': datetime.now().isoformat()
         }
 
-    def generate_id(self, filepath: Path) -> str:
-        """Generate a unique ID from the file path."""
-        content = str(filepath).encode()
-        return hashlib.md5(content).hexdigest()[:12]
+    def generate_id(self, filepath: Path, salt: str = '') -> str:
+        """Generate a stable ID from the file's content.
+
+        Hashes the first 64 KB plus the file size, so the ID survives
+        renames and moves between collections. A salt (the relative path)
+        tells apart copies of the same file in several places.
+        """
+        h = hashlib.blake2b(digest_size=6)
+        with open(filepath, 'rb') as f:
+            h.update(f.read(65536))
+        h.update(filepath.stat().st_size.to_bytes(8, 'little'))
+        h.update(salt.encode())
+        return h.hexdigest()
+
+    def assign_ids(self, image_files: List[Path]) -> List[str]:
+        """Generate an ID per file, making repeated ones unique.
+
+        The same photo placed in two collections would otherwise share an
+        ID, and with it the output paths and the gallery's React keys.
+        Later copies get their relative path mixed in instead.
+        """
+        ids = []
+        seen = set()
+        for filepath in image_files:
+            image_id = self.generate_id(filepath)
+            if image_id in seen:
+                relative = filepath.relative_to(self.input_dir).as_posix()
+                print(f"  Warning: {relative} duplicates another image; "
+                      f"giving it a path-derived ID")
+                image_id = self.generate_id(filepath, salt=relative)
+            seen.add(image_id)
+            ids.append(image_id)
+        return ids
 
     def parse_filename(self, filepath: Path) -> Dict[str, str]:
         """Parse title and location from filename."""
@@ -222,44 +386,46 @@ class ImageProcessor:
         metadata = {}
 
         try:
-            exif_data = image._getexif()
+            # getexif() is parsed once and cached on the image; unlike the
+            # legacy _getexif() it also works for TIFF masters. Camera
+            # settings live in the Exif sub-IFD, so merge it with IFD0.
+            exif_ifd0 = image.getexif()
+            exif_data = {**exif_ifd0, **exif_ifd0.get_ifd(ExifTags.IFD.Exif)}
             if exif_data:
-                exif = {ExifTags.TAGS.get(k, k): v for k, v in exif_data.items()}
-
                 # Camera info
-                if 'Make' in exif and 'Model' in exif:
-                    make = str(exif['Make']).strip()
-                    model = str(exif['Model']).strip()
+                if TAG_MAKE in exif_data and TAG_MODEL in exif_data:
+                    make = str(exif_data[TAG_MAKE]).strip()
+                    model = str(exif_data[TAG_MODEL]).strip()
                     # Remove duplicate make from model if present
                     if model.startswith(make):
                         model = model[len(make):].strip()
                     metadata['camera'] = f"{make} {model}"
-                elif 'Model' in exif:
-                    metadata['camera'] = str(exif['Model']).strip()
+                elif TAG_MODEL in exif_data:
+                    metadata['camera'] = str(exif_data[TAG_MODEL]).strip()
 
                 # Lens info
-                if 'LensModel' in exif:
-                    metadata['lens'] = str(exif['LensModel']).strip()
+                if TAG_LENS_MODEL in exif_data:
+                    metadata['lens'] = str(exif_data[TAG_LENS_MODEL]).strip()
 
                 # Exposure settings
-                if 'FocalLength' in exif:
-                    focal = exif['FocalLength']
+                if TAG_FOCAL_LENGTH in exif_data:
+                    focal = exif_data[TAG_FOCAL_LENGTH]
                     if hasattr(focal, 'numerator'):
                         focal = focal.numerator / focal.denominator
                     elif isinstance(focal, tuple):
                         focal = focal[0] / focal[1] if focal[1] else focal[0]
                     metadata['focalLength'] = f"{int(focal)}mm"
 
-                if 'FNumber' in exif:
-                    f_num = exif['FNumber']
+                if TAG_F_NUMBER in exif_data:
+                    f_num = exif_data[TAG_F_NUMBER]
                     if hasattr(f_num, 'numerator'):
                         f_num = f_num.numerator / f_num.denominator
                     elif isinstance(f_num, tuple):
                         f_num = f_num[0] / f_num[1] if f_num[1] else f_num[0]
                     metadata['aperture'] = f"f/{f_num:.1f}".rstrip('0').rstrip('.')
 
-                if 'ExposureTime' in exif:
-                    exp = exif['ExposureTime']
+                if TAG_EXPOSURE_TIME in exif_data:
+                    exp = exif_data[TAG_EXPOSURE_TIME]
                     if hasattr(exp, 'numerator'):
                         if exp.numerator == 1:
                             metadata['shutterSpeed'] = f"1/{exp.denominator}s"
@@ -276,16 +442,16 @@ class ImageProcessor:
                             val = exp[0] / exp[1] if exp[1] else exp[0]
                             metadata['shutterSpeed'] = f"{val}s"
 
-                if 'ISOSpeedRatings' in exif:
-                    iso = exif['ISOSpeedRatings']
+                if TAG_ISO in exif_data:
+                    iso = exif_data[TAG_ISO]
                     if isinstance(iso, tuple):
                         iso = iso[0]
                     metadata['iso'] = str(iso)
 
                 # Date
-                if 'DateTimeOriginal' in exif:
+                if TAG_DATE_TIME_ORIGINAL in exif_data:
                     try:
-                        dt = datetime.strptime(str(exif['DateTimeOriginal']), '%Y:%m:%d %H:%M:%S')
+                        dt = datetime.strptime(str(exif_data[TAG_DATE_TIME_ORIGINAL]), '%Y:%m:%d %H:%M:%S')
                         metadata['date'] = dt.strftime('%B %d, %Y')
                         metadata['dateSort'] = dt.strftime('%Y%m%d%H%M%S')
                     except:
@@ -295,10 +461,21 @@ class ImageProcessor:
 
         return metadata
 
+    def fit_within(self, image: Image.Image, max_size: int) -> Image.Image:
+        """Return a downscaled image that fits in a max_size square.
+
+        Unlike Image.thumbnail() this leaves the source untouched, so the
+        full-resolution master doesn't have to be copied first.
+        """
+        scale = min(max_size / image.width, max_size / image.height, 1)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # reducing_gap first box-reduces by an integer factor, leaving only
+        # a final <3x step for the much more expensive LANCZOS filter
+        return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
     def create_thumbnail(self, image: Image.Image, output_path: Path) -> None:
         """Create an optimized WebP thumbnail."""
-        img = image.copy()
-        img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+        img = self.fit_within(image, THUMBNAIL_SIZE)
 
         # Convert to RGB if necessary
         if img.mode in ('RGBA', 'P'):
@@ -307,64 +484,118 @@ class ImageProcessor:
         img.save(output_path, 'WEBP', quality=WEBP_QUALITY, method=6)
         img.close()
 
-    def create_preview(self, image: Image.Image, output_path: Path) -> None:
-        """Create a high-quality preview image."""
-        img = image.copy()
-        img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.Resampling.LANCZOS)
+    def create_preview(self, image: Image.Image, output_path: Path) -> Image.Image:
+        """Create a high-quality preview image and return it."""
+        img = self.fit_within(image, PREVIEW_SIZE)
 
         # Convert to RGB if necessary
         if img.mode in ('RGBA', 'P'):
             img = img.convert('RGB')
 
-        img.save(output_path, 'JPEG', quality=JPEG_QUALITY, optimize=True)
-        img.close()
-
-    def copy_master(self, filepath: Path, output_path: Path) -> int:
-        """Copy the master file and return its size."""
-        shutil.copy2(filepath, output_path)
-        return output_path.stat().st_size
+        img.save(output_path, 'JPEG', quality=JPEG_QUALITY)
+        return img
 
-    def process_image(self, filepath: Path, index: int, total: int) -> Optional[Dict[str, Any]]:
-        """Process a single image file."""
-        print(f"[{index}/{total}] Processing: {filepath.name}")
+    def copy_master(self, filepath: Path) -> Tuple[str, int]:
+        """Copy the master file under a name hashed from its full content.
 
+        The hash is computed while copying, so it costs no extra read. A
+        master's name only ever refers to one version of the file and can
+        be cached as immutable. Returns (filename, size).
+        """
+        h = hashlib.blake2b(digest_size=16)
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.masters_dir, suffix='.part')
         try:
-            # Generate unique ID
-            image_id = self.generate_id(filepath)
+            with open(filepath, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                    h.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+            shutil.copystat(filepath, tmp_path)
+            filename = f"{h.hexdigest()}{filepath.suffix.lower()}"
+            os.replace(tmp_path, self.masters_dir / filename)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return filename, size
+
+    def prune_masters(self, results: List[Dict[str, Any]]) -> int:
+        """Delete masters that no image in the manifest points to.
+
+        A master whose content changed is copied under a new hash, which
+        leaves the earlier copy (or a pre-hash <image_id><ext> one) behind.
+        Returns the number of files removed.
+        """
+        keep = {Path(r['master']).name for r in results}
+        removed = 0
+        for path in self.masters_dir.iterdir():
+            if path.is_file() and path.name not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def process_image(self, filepath: Path, image_id: str, index: int, total: int,
+                      log: Callable[[str], None] = print) -> Optional[Dict[str, Any]]:
+        """Process a single image file under the ID assigned by process_all.
+
+        Progress goes to ``log``; worker processes collect it so each
+        image's lines are printed together.
+        """
+        log(f"[{index}/{total}] Processing: {filepath.relative_to(self.input_dir)}")
 
+        try:
             # Parse filename
             name_info = self.parse_filename(filepath)
             collection = self.get_collection(filepath)
 
-            # Open image with Pillow for metadata and resizing
+            tiles_folder = self.tiles_dir / image_id
+            tiles_folder.mkdir(exist_ok=True)
+            dzi_info = None
+
+            # Decode the master once for metadata, preview and thumbnail.
+            # Without pyvips the DZI tiles are cut from the same image; with
+            # it, libvips streams the file itself once this copy is freed.
             with Image.open(filepath) as img:
                 width, height = img.size
                 aspect_ratio = width / height
 
+                # Tiles come from the file when libvips is available, so
+                # for JPEGs let libjpeg downscale during decode (1/2, 1/4,
+                # 1/8); full dimensions were read from the header above.
+                if pyvips is not None and filepath.suffix.lower() in ('.jpg', '.jpeg'):
+                    img.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))
+                img.load()
+
                 # Extract metadata
                 metadata = self.extract_metadata(img, filepath)
 
-                # Create thumbnail
-                thumb_path = self.thumbnails_dir / f"{image_id}.webp"
-                self.create_thumbnail(img, thumb_path)
-                print(f"        -> Thumbnail created")
-
                 # Create preview
                 preview_path = self.previews_dir / f"{image_id}.jpg"
-                self.create_preview(img, preview_path)
-                print(f"        -> Preview created")
+                preview = self.create_preview(img, preview_path)
+                log(f"        -> Preview created")
 
-            # Create DZI tiles
-            tiles_folder = self.tiles_dir / image_id
-            tiles_folder.mkdir(exist_ok=True)
-            dzi_info = self.dzi_generator.create_tiles(filepath, tiles_folder)
-            print(f"        -> DZI tiles created ({dzi_info['num_levels']} levels)")
+                # Create thumbnail from the much smaller preview
+                thumb_path = self.thumbnails_dir / f"{image_id}.webp"
+                self.create_thumbnail(preview, thumb_path)
+                preview.close()
+                log(f"        -> Thumbnail created")
+
+                if pyvips is None:
+                    dzi_info = self.dzi_generator.create_tiles(img, tiles_folder)
+
+            if dzi_info is None:
+                try:
+                    dzi_info = self.dzi_generator.create_tiles_from_file(filepath, tiles_folder)
+                except pyvips.Error:
+                    # A format this libvips build can't read; Pillow could
+                    with Image.open(filepath) as img:
+                        dzi_info = self.dzi_generator.create_tiles(img, tiles_folder)
+            log(f"        -> DZI tiles created ({dzi_info['num_levels']} levels)")
 
             # Copy master file
             master_ext = filepath.suffix.lower()
-            master_path = self.masters_dir / f"{image_id}{master_ext}"
-            master_size = self.copy_master(filepath, master_path)
-            print(f"        -> Master copied ({master_size / (1024*1024):.1f} MB)")
+            master_name, master_size = self.copy_master(filepath)
+            log(f"        -> Master copied ({master_size / (1024*1024):.1f} MB)")
 
             # Build image data
             image_data = {
@@ -378,7 +609,7 @@ class ImageProcessor:
                 'thumbnail': f"thumbnails/{image_id}.webp",
                 'preview': f"previews/{image_id}.jpg",
                 'tiles': f"tiles/{image_id}",
-                'master': f"masters/{image_id}{master_ext}",
+                'master': f"masters/{master_name}",
                 'masterSize': master_size,
                 'masterFormat': master_ext.lstrip('.'),
                 **name_info,
@@ -388,24 +619,19 @@ class ImageProcessor:
             # Clean up None values
             image_data = {k: v for k, v in image_data.items() if v is not None}
 
-            print(f"        [OK] Complete")
+            log(f"        [OK] Complete")
             return image_data
 
         except Exception as e:
-            print(f"        [ERROR] {e}")
             import traceback
-            traceback.print_exc()
+            log(f"        [ERROR] {e}")
+            log(traceback.format_exc().rstrip())
             return None
 
     def process_all(self, max_workers: int = 4) -> None:
         """Process all images in the input directory."""
         # Find all supported images
-        image_files = []
-        for ext in SUPPORTED_FORMATS:
-            image_files.extend(self.input_dir.rglob(f'*{ext}'))
-            image_files.extend(self.input_dir.rglob(f'*{ext.upper()}'))
-
-        image_files = sorted(set(image_files))
+        image_files = sorted(iter_images(self.input_dir))
 
         if not image_files:
             print(f"No images found in {self.input_dir}")
@@ -417,15 +643,60 @@ class ImageProcessor:
         print(f"  Input:  {self.input_dir}")
         print(f"  Output: {self.output_dir}")
         print(f"  Images: {len(image_files)}")
+        # Pillow-SIMD versions carry a ".postN" suffix
+        simd = ' (SIMD)' if 'post' in Image.__version__ else ''
+        print(f"  Pillow: {Image.__version__}{simd}")
         print(f"{'='*60}\n")
 
-        # Process images
+        # Process images in parallel, one worker process per image
+        config = {
+            'input_dir': self.input_dir,
+            'output_dir': self.output_dir,
+            'storage_url': self.storage_url,
+            'tile_format': self.tile_format,
+            # Share the cores between worker processes rather than giving
+            # each one a tile thread per core
+            'tile_threads': max(1, (os.cpu_count() or 1) // max_workers)
+        }
+        # Avoid fork() with Pillow's internal threads on macOS
+        mp_context = multiprocessing.get_context('spawn') if sys.platform == 'darwin' else None
+
+        image_ids = self.assign_ids(image_files)
+
         results = []
-        for i, filepath in enumerate(image_files, 1):
-            result = self.process_image(filepath, i, len(image_files))
+        total = len(image_files)
+
+        def collect(future, filepath):
+            # A failing image is logged and left out; the rest still make
+            # it into the manifest
+            try:
+                result, log_lines = future.result()
+            except Exception as e:
+                result = None
+                log_lines = [f"[ERROR] {filepath.relative_to(self.input_dir)}: {type(e).__name__}: {e}"]
+            print('\n'.join(log_lines))
             if result:
                 results.append(result)
-            print()
+
+        broken = []
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+            futures = {
+                executor.submit(_process_one, config, filepath, image_id, i, total): (filepath, image_id, i)
+                for i, (filepath, image_id) in enumerate(zip(image_files, image_ids), 1)
+            }
+            for future in as_completed(futures):
+                if isinstance(future.exception(), BrokenProcessPool):
+                    broken.append(futures[future])
+                else:
+                    collect(future, futures[future][0])
+
+        # A worker that dies (e.g. killed for memory on a huge master) breaks
+        # the pool and fails every image still on it. Retry those one per
+        # fresh process, so only an image that crashes its worker is lost.
+        for filepath, image_id, i in broken:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as executor:
+                collect(executor.submit(_process_one, config, filepath, image_id, i, total), filepath)
+        print()
 
         # Sort by date if available, otherwise by title
         results.sort(key=lambda x: (x.get('dateSort', ''), x.get('title', '')), reverse=True)
@@ -441,11 +712,24 @@ class ImageProcessor:
         ))
         self.gallery_data['lastUpdated'] = datetime.now().isoformat()
 
-        # Write gallery.json
+        # Write gallery.json compact, since every visitor downloads it, and
+        # gallery.pretty.json as an indented copy for humans
         gallery_json_path = self.output_dir / 'data' / 'gallery.json'
         gallery_json_path.parent.mkdir(exist_ok=True)
-        with open(gallery_json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.gallery_data, f, indent=2, ensure_ascii=False)
+        pretty_json_path = gallery_json_path.with_name('gallery.pretty.json')
+        if orjson is not None:
+            gallery_json_path.write_bytes(orjson.dumps(self.gallery_data))
+            pretty_json_path.write_bytes(orjson.dumps(self.gallery_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(gallery_json_path, 'w', encoding='utf-8') as f:
+                json.dump(self.gallery_data, f, separators=(',', ':'), ensure_ascii=False)
+            with open(pretty_json_path, 'w', encoding='utf-8') as f:
+                json.dump(self.gallery_data, f, indent=2, ensure_ascii=False)
+
+        # Superseded masters would otherwise be uploaded again on every run
+        removed = self.prune_masters(results)
+        if removed:
+            print(f"Removed {removed} superseded master(s) from {self.masters_dir}\n")
 
         print(f"{'='*60}")
         print(f"  Processing Complete!")
@@ -457,6 +741,25 @@ class ImageProcessor:
         print(f"{'='*60}\n")
 
 
+def _process_one(config: Dict[str, Any], filepath: Path, image_id: str,
+                 index: int, total: int) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Process a single image in a worker process.
+
+    Returns the image data and its log lines, which the parent prints in
+    one piece so output from concurrent workers doesn't interleave.
+    """
+    log_lines = []
+    processor = ImageProcessor(
+        config['input_dir'],
+        config['output_dir'],
+        config['storage_url'],
+        config['tile_format'],
+        config['tile_threads']
+    )
+    result = processor.process_image(filepath, image_id, index, total, log_lines.append)
+    return result, log_lines
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Process images for the portfolio gallery',
@@ -504,6 +807,13 @@ Collections:
         help='Base URL for cloud storage (used in gallery.json)'
     )
 
+    parser.add_argument(
+        '--tile-format',
+        choices=['webp', 'jpg'],
+        default=TILE_FORMAT,
+        help=f'Image format for DZI tiles (default: {TILE_FORMAT})'
+    )
+
     parser.add_argument(
         '--workers',
         type=int,
@@ -520,7 +830,8 @@ Collections:
     processor = ImageProcessor(
         args.input,
         args.output,
-        args.storage_url
+        args.storage_url,
+        args.tile_format
     )
 
     processor.process_all(args.workers)
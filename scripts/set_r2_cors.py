@@ -37,7 +37,8 @@ def main():
     cors_configuration = {
         'CORSRules': [
             {
-                'AllowedHeaders': ['*'],
+                # Range: --pack-tiles serves tiles as byte ranges of a pack
+                'AllowedHeaders': ['*', 'Range'],
                 'AllowedMethods': ['GET', 'HEAD'],
                 'AllowedOrigins': [
                     'https://edward-ma-photography.vercel.app',
@@ -46,7 +47,7 @@ def main():
                     'http://localhost:3001',
                     '*'  # Allow all origins for public bucket
                 ],
-                'ExposeHeaders': ['ETag', 'Content-Length', 'Content-Type'],
+                'ExposeHeaders': ['ETag', 'Content-Length', 'Content-Type', 'Content-Range'],
                 'MaxAgeSeconds': 86400
             }
         ]
@@ -2,32 +2,61 @@
 """
 Upload processed images to Cloudflare R2 storage.
 Uses boto3 (S3-compatible API) to upload all image assets.
+
+Install aioboto3 (pip install aioboto3) to upload from a single asyncio
+event loop with many more requests in flight; --sync keeps thread pools.
+--processes N spreads uploads over N worker processes instead.
+--presigned sends single-part uploads as plain HTTP PUTs to presigned URLs.
+--pack-tiles uploads each DZI pyramid level as one .pack file plus an
+image.idx index, which the viewer reads tiles from by byte range.
 """
 
 import os
 import sys
 import json
-import mimetypes
+import base64
+import gzip
+import hashlib
+import argparse
+import asyncio
+import queue
+import threading
+import http.client
+from collections import deque
+from contextlib import contextmanager
+from itertools import zip_longest
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 try:
     import boto3
+    import urllib3
+    import urllib3.connection
+    from boto3.s3.transfer import TransferConfig
     from botocore.config import Config
 except ImportError:
     print("Missing boto3. Install with: pip install boto3")
     sys.exit(1)
 
+# aioboto3 is optional: when available, uploads run on a single asyncio
+# event loop instead of thread pools (use --sync to force the threads)
+try:
+    import aioboto3
+except ImportError:
+    aioboto3 = None
+
 # Load environment variables from .env file
 def load_env():
     env_path = Path(__file__).parent.parent / '.env'
     if env_path.exists():
-        with open(env_path) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ.setdefault(key.strip(), value.strip())
+        for line in env_path.read_text().splitlines():
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, _, value = line.partition('=')
+            value = value.strip().strip('"').strip("'")
+            os.environ.setdefault(key.strip(), value)
 
 load_env()
 
@@ -45,59 +74,360 @@ if not all([R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY, R2_ACCOUNT_ID]):
 # R2 endpoint
 R2_ENDPOINT = f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
 
-# Initialize S3 client for R2
-s3_client = boto3.client(
-    's3',
-    endpoint_url=R2_ENDPOINT,
-    aws_access_key_id=R2_ACCESS_KEY_ID,
-    aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-    config=Config(
+def client_config(max_pool_connections: int) -> Config:
+    """botocore settings shared by the threaded and asyncio clients."""
+    return Config(
         signature_version='s3v4',
-        retries={'max_attempts': 3, 'mode': 'adaptive'}
+        # Adaptive mode also rate-limits the client when R2 answers 503 Slow Down
+        retries={'max_attempts': 5, 'mode': 'adaptive'},
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=True,
+        connect_timeout=5,
+        read_timeout=60
+    )
+
+# Socket write size for request bodies read from files
+HTTP_BLOCKSIZE = 1024 * 1024
+
+def raise_http_blocksize(blocksize: int = HTTP_BLOCKSIZE) -> None:
+    """Make new HTTP connections send file bodies in larger blocks.
+
+    Hack: http.client reads file-like request bodies (multipart parts) and
+    sends them `blocksize` bytes at a time, 8 KB by default (16 KB under
+    urllib3 2.x), so a 64 MB part takes thousands of send() calls that
+    each drop and retake the GIL. Neither boto3 nor botocore exposes the
+    setting, so raise the constructor default that botocore's connection
+    pool falls back on. Only connections created afterwards are affected.
+    """
+    init = http.client.HTTPConnection.__init__
+    init.__defaults__ = tuple(
+        blocksize if value == 8192 else value for value in init.__defaults__
+    )
+    kwdefaults = urllib3.connection.HTTPConnection.__init__.__kwdefaults__
+    if kwdefaults and 'blocksize' in kwdefaults:
+        kwdefaults['blocksize'] = blocksize
+
+def create_s3_client(max_pool_connections: int):
+    """Create the S3 client for R2.
+
+    A single client is shared by all upload threads (boto3 clients are
+    thread-safe); its pool must hold a keep-alive connection per thread
+    so uploads don't pay a new TLS handshake each time.
+
+    botocore talks HTTP/1.1 only, so each pooled connection is its own
+    TCP/TLS socket and throughput scales with the pool size, rather than
+    being multiplexed over one HTTP/2 connection.
+    """
+    return boto3.client(
+        's3',
+        endpoint_url=R2_ENDPOINT,
+        aws_access_key_id=R2_ACCESS_KEY_ID,
+        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
+        config=client_config(max_pool_connections)
+    )
+
+def create_http_pool(maxsize: int) -> urllib3.PoolManager:
+    """Create the connection pool for --presigned uploads.
+
+    Requests to presigned URLs skip botocore's per-request pipeline
+    (parameter validation, event hooks, response parsing), so the retry
+    and timeout policy of client_config() is repeated here.
+    """
+    return urllib3.PoolManager(
+        num_pools=1,
+        maxsize=maxsize,
+        block=True,
+        timeout=urllib3.Timeout(connect=5, read=60),
+        retries=urllib3.Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None
+        )
     )
-)
+
+# S3 client for R2, created in main() once the worker count is known
+# (and again in each worker process by init_upload_process)
+s3_client = None
+
+# Connection pool for --presigned uploads; None sends them through boto3
+http_pool = None
+
+def init_upload_process(max_pool_connections: int, presigned: bool) -> None:
+    """Give an upload worker process its own S3 client.
+
+    Clients and their pooled connections must not be shared across a
+    fork, so each process replaces whatever it inherited.
+    """
+    global s3_client, http_pool
+    raise_http_blocksize()
+    s3_client = create_s3_client(max_pool_connections)
+    http_pool = create_http_pool(max_pool_connections) if presigned else None
+
+# Files above the threshold are sent as concurrent multipart uploads
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 64 * 1024 * 1024
+
+# Streamed multipart uploads: parts in memory are bounded by the read-ahead
+# queue plus the parts being sent
+STREAM_PART_SIZE = 8 * 1024 * 1024
+STREAM_READ_AHEAD = 2
+MAX_PARTS = 10_000
+
+# Upload pools: files under SMALL_FILE_SIZE bytes use the small-file pool
+SMALL_FILE_SIZE = 1_000_000
+SMALL_FILE_WORKERS = 64
+LARGE_FILE_WORKERS = 4
+
+# Most uploads queued or in flight at once per pool, as a multiple of its
+# workers: keeps every thread busy without queueing the whole file list
+PENDING_PER_WORKER = 2
 
 # Directories to upload
 PUBLIC_DIR = Path(__file__).parent.parent / 'public'
 UPLOAD_DIRS = ['thumbnails', 'previews', 'tiles', 'masters']
 
-def get_content_type(filepath: Path) -> str:
-    """Get the MIME type for a file."""
-    content_type, _ = mimetypes.guess_type(str(filepath))
-    if content_type:
-        return content_type
-
-    # Fallback based on extension
-    ext = filepath.suffix.lower()
-    type_map = {
-        '.webp': 'image/webp',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.tiff': 'image/tiff',
-        '.tif': 'image/tiff',
-        '.dzi': 'application/xml',
-        '.json': 'application/json',
+# Masters live under content-hash keys and never change in place. Other
+# assets are keyed by image id and only change if an image is reprocessed;
+# thumbnails, which the grid loads first, and the gallery manifest, which
+# is rewritten on every processing run, get a short TTL instead
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SHORT_TTL = 'public, max-age=300'
+
+# (Content-Type, Cache-Control) for every extension the pipeline produces
+UPLOAD_HEADERS = {
+    '.webp': ('image/webp', IMMUTABLE),
+    '.jpg': ('image/jpeg', IMMUTABLE),
+    '.jpeg': ('image/jpeg', IMMUTABLE),
+    '.png': ('image/png', IMMUTABLE),
+    '.tiff': ('image/tiff', IMMUTABLE),
+    '.tif': ('image/tiff', IMMUTABLE),
+    '.heic': ('image/heic', IMMUTABLE),
+    '.heif': ('image/heif', IMMUTABLE),
+    '.dzi': ('application/xml', IMMUTABLE),
+    '.xml': ('application/xml', IMMUTABLE),
+    '.json': ('application/json', SHORT_TTL),
+    '.pack': ('application/octet-stream', IMMUTABLE),
+    # image.idx is rewritten in place whenever the packs change
+    '.idx': ('application/json', SHORT_TTL),
+}
+DEFAULT_HEADERS = ('application/octet-stream', IMMUTABLE)
+
+# Cache-Control overrides for whole upload directories
+DIR_CACHE_CONTROL = {
+    'thumbnails': SHORT_TTL,
+}
+
+# process_images.py names masters by a hash of their full content
+CONTENT_HASHED_PREFIX = 'masters/'
+
+# Text sidecars (.dzi, .xml, .json, .idx) are stored gzip-compressed with
+# Content-Encoding: gzip
+COMPRESSIBLE_TYPES = {'application/xml', 'application/json'}
+
+# --pack-tiles: pyramid levels up to this size are packed into a single
+# object, so they still go up as one PUT
+PACK_MAX_SIZE = MULTIPART_THRESHOLD
+PACK_SUFFIXES = ('.pack', '.idx')
+
+def file_md5(filepath: str) -> str:
+    """Compute the hex MD5 of a file, streamed in 1 MB chunks."""
+    md5 = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def content_md5(body: bytes) -> str:
+    """Compute the Content-MD5 header value for a request body."""
+    return base64.b64encode(hashlib.md5(body).digest()).decode()
+
+def list_bucket() -> dict:
+    """Map every key in the bucket to its object listing entry.
+
+    One paginated ListObjectsV2 pass (1000 keys per request) replaces a
+    HEAD request per file.
+    """
+    existing = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=R2_BUCKET_NAME):
+        for obj in page.get('Contents', []):
+            existing[obj['Key']] = obj
+    return existing
+
+def read_body(filepath: str, content_type: str):
+    """Read a single-part upload body, gzipping text sidecars.
+
+    Returns (body, content_encoding). gzip output is made deterministic
+    (mtime=0) so unchanged files compress to the same bytes and ETag.
+    """
+    with open(filepath, 'rb') as f:
+        body = f.read()
+    if content_type in COMPRESSIBLE_TYPES:
+        return gzip.compress(body, compresslevel=6, mtime=0), 'gzip'
+    return body, None
+
+def is_unchanged(filepath: str, key: str, size: int, content_type: str, remote: dict) -> bool:
+    """Check whether a listed object is identical to the local file."""
+    if content_type in COMPRESSIBLE_TYPES:
+        # Stored compressed; compare against what would be uploaded
+        body, _ = read_body(filepath, content_type)
+        return (remote['Size'] == len(body) and
+                remote['ETag'].strip('"') == hashlib.md5(body).hexdigest())
+
+    if remote['Size'] != size:
+        return False
+    if key.startswith(CONTENT_HASHED_PREFIX):
+        # Named by a hash of their full content, so the key is the version
+        return True
+    if size < MULTIPART_THRESHOLD:
+        # Single-part uploads have the content MD5 as their ETag
+        return remote['ETag'].strip('"') == file_md5(filepath)
+
+    # Multipart ETags are not a content MD5; fall back to size and age
+    return remote['LastModified'].timestamp() >= os.stat(filepath).st_mtime
+
+def read_parts(filepath: str, part_size: int, parts: queue.Queue, stop: threading.Event) -> None:
+    """Reader thread: queue (part_number, data) for each part, then None.
+
+    Any error is queued in place of the next part, and the None end
+    marker is always sent. Reading ends early once stop is set.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            for number, data in enumerate(iter(lambda: f.read(part_size), b''), 1):
+                if stop.is_set():
+                    break
+                parts.put((number, data))
+    except Exception as e:
+        parts.put(e)
+    finally:
+        parts.put(None)
+
+def upload_part(key: str, upload_id: str, number: int, data: bytes) -> dict:
+    """Send one part of a multipart upload."""
+    response = s3_client.upload_part(
+        Bucket=R2_BUCKET_NAME,
+        Key=key,
+        UploadId=upload_id,
+        PartNumber=number,
+        Body=data,
+        ContentMD5=content_md5(data)
+    )
+    return {'PartNumber': number, 'ETag': response['ETag']}
+
+def stream_upload(filepath: str, key: str, file_size: int, content_type: str,
+                  cache_control: str, concurrency: int) -> None:
+    """Multipart upload that reads the file while earlier parts are sent.
+
+    A reader thread stays up to STREAM_READ_AHEAD parts ahead of the
+    senders, so disk reads overlap network writes instead of alternating
+    with them in each transfer thread.
+    """
+    part_size = max(STREAM_PART_SIZE, -(-file_size // MAX_PARTS))
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=R2_BUCKET_NAME,
+        Key=key,
+        ContentType=content_type,
+        CacheControl=cache_control
+    )['UploadId']
+
+    parts = queue.Queue(maxsize=STREAM_READ_AHEAD)
+    stop = threading.Event()
+    reader = threading.Thread(target=read_parts, args=(filepath, part_size, parts, stop), daemon=True)
+    reader.start()
+    try:
+        in_flight = threading.Semaphore(concurrency)
+        failed = []
+        futures = []
+
+        def on_done(future):
+            if future.exception() is not None:
+                failed.append(future.exception())
+            in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for item in iter(parts.get, None):
+                if isinstance(item, Exception):
+                    raise item
+                in_flight.acquire()
+                # Stop sending the rest of the file once any part failed
+                if failed:
+                    raise failed[0]
+                future = pool.submit(upload_part, key, upload_id, *item)
+                future.add_done_callback(on_done)
+                futures.append(future)
+        completed = [future.result() for future in futures]
+
+        s3_client.complete_multipart_upload(
+            Bucket=R2_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': completed}
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=R2_BUCKET_NAME, Key=key, UploadId=upload_id)
+        raise
+    finally:
+        # Stop the reader and unblock it if we stopped taking parts early
+        stop.set()
+        while reader.is_alive():
+            try:
+                parts.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def put_presigned(filepath: str, key: str, content_type: str, cache_control: str) -> None:
+    """Upload a single-part file with a plain PUT to a presigned URL.
+
+    The URL is still SigV4-signed, but locally in one call; the request
+    itself goes straight through the shared urllib3 pool. The headers
+    signed into the URL must be sent unchanged.
+    """
+    body, encoding = read_body(filepath, content_type)
+    params = {
+        'Bucket': R2_BUCKET_NAME,
+        'Key': key,
+        'ContentType': content_type,
+        'CacheControl': cache_control
     }
-    return type_map.get(ext, 'application/octet-stream')
+    headers = {
+        'Content-Type': content_type,
+        'Cache-Control': cache_control,
+        'Content-MD5': content_md5(body)
+    }
+    if encoding:
+        params['ContentEncoding'] = headers['Content-Encoding'] = encoding
+
+    url = s3_client.generate_presigned_url('put_object', Params=params, ExpiresIn=3600)
+    response = http_pool.request('PUT', url, body=body, headers=headers)
+    if response.status != 200:
+        raise RuntimeError(f"PUT failed with HTTP {response.status}: {response.data[:200]!r}")
 
-def upload_file(filepath: Path, key: str) -> dict:
+def upload_file(filepath: str, key: str, file_size: int, content_type: str,
+                cache_control: str, transfer_config: TransferConfig) -> dict:
     """Upload a single file to R2."""
     try:
-        content_type = get_content_type(filepath)
-        file_size = filepath.stat().st_size
-
-        # Set cache headers for immutable content
-        cache_control = 'public, max-age=31536000, immutable'
-
-        with open(filepath, 'rb') as f:
+        if file_size < MULTIPART_THRESHOLD and http_pool is not None:
+            put_presigned(filepath, key, content_type, cache_control)
+        elif file_size < MULTIPART_THRESHOLD:
+            # Single PUT with a Content-MD5 that R2 verifies. The body is
+            # read in one call and hashed from memory rather than streamed
+            # from disk in 8 KB reads.
+            body, encoding = read_body(filepath, content_type)
+            extra = {'ContentEncoding': encoding} if encoding else {}
             s3_client.put_object(
                 Bucket=R2_BUCKET_NAME,
                 Key=key,
-                Body=f,
+                Body=body,
                 ContentType=content_type,
-                CacheControl=cache_control
+                CacheControl=cache_control,
+                ContentMD5=content_md5(body),
+                **extra
             )
+        else:
+            stream_upload(filepath, key, file_size, content_type, cache_control,
+                          transfer_config.max_request_concurrency)
 
         return {
             'success': True,
@@ -111,59 +441,491 @@ def upload_file(filepath: Path, key: str) -> dict:
             'error': str(e)
         }
 
-def collect_files() -> list:
-    """Collect all files to upload."""
+async def upload_file_async(s3, semaphore: asyncio.Semaphore, filepath: str, key: str,
+                            file_size: int, content_type: str, cache_control: str,
+                            transfer_config: TransferConfig) -> dict:
+    """Upload a single file to R2 from the event loop."""
+    async with semaphore:
+        try:
+            if file_size < MULTIPART_THRESHOLD:
+                # Single PUT with a Content-MD5 that R2 verifies; the file is
+                # read once, off the event loop, for both body and digest
+                body, encoding = await asyncio.to_thread(read_body, filepath, content_type)
+                extra = {'ContentEncoding': encoding} if encoding else {}
+                await s3.put_object(
+                    Bucket=R2_BUCKET_NAME,
+                    Key=key,
+                    Body=body,
+                    ContentType=content_type,
+                    CacheControl=cache_control,
+                    ContentMD5=content_md5(body),
+                    **extra
+                )
+            else:
+                await s3.upload_file(
+                    filepath,
+                    R2_BUCKET_NAME,
+                    key,
+                    ExtraArgs={
+                        'ContentType': content_type,
+                        'CacheControl': cache_control
+                    },
+                    Config=transfer_config
+                )
+
+            return {
+                'success': True,
+                'key': key,
+                'size': file_size
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'key': key,
+                'error': str(e)
+            }
+
+def iter_files(root: str, exclude: frozenset = frozenset()):
+    """Yield (path string, size) for every file under root.
+
+    os.scandir reuses the type and stat data of each directory listing,
+    so the walk costs one getdents per directory instead of a stat call
+    per file. Directories whose path is in exclude are skipped.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in exclude:
+                    yield from iter_files(entry.path, exclude)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path, entry.stat().st_size
+
+def pack_pyramid(dzi_path: Path) -> list:
+    """Pack the levels of one DZI pyramid and write its image.idx.
+
+    Each level directory of at most PACK_MAX_SIZE bytes is concatenated
+    into <name>_files/<level>.pack next to it. The index records the DZI
+    geometry and, per packed level, the [offset, length] of every tile
+    keyed by "<col>_<row>". Larger levels are left as individual tiles.
+    Returns the paths of the level directories that were packed; when
+    none were, no index is left behind.
+    """
+    image = ET.parse(dzi_path).getroot()
+    size = next(el for el in image if el.tag.endswith('Size'))
+    index = {
+        'width': int(size.get('Width')),
+        'height': int(size.get('Height')),
+        'tileSize': int(image.get('TileSize')),
+        'overlap': int(image.get('Overlap')),
+        'format': image.get('Format'),
+        'levels': {}
+    }
+
+    packed = []
+    files_dir = dzi_path.with_name(f"{dzi_path.stem}_files")
+    for level_dir in os.scandir(files_dir):
+        if not level_dir.is_dir(follow_symlinks=False):
+            continue
+        tiles = sorted(iter_files(level_dir.path))
+        if sum(tile_size for _, tile_size in tiles) > PACK_MAX_SIZE:
+            Path(f"{level_dir.path}.pack").unlink(missing_ok=True)
+            continue
+
+        entries = {}
+        offset = 0
+        with open(f"{level_dir.path}.pack", 'wb') as pack:
+            for path, tile_size in tiles:
+                pack.write(Path(path).read_bytes())
+                entries[os.path.splitext(os.path.basename(path))[0]] = [offset, tile_size]
+                offset += tile_size
+        index['levels'][level_dir.name] = entries
+        packed.append(level_dir.path)
+
+    idx_path = dzi_path.with_suffix('.idx')
+    if packed:
+        idx_path.write_text(json.dumps(index, separators=(',', ':')))
+    else:
+        idx_path.unlink(missing_ok=True)
+    return packed
+
+def pack_tiles():
+    """Pack every tile pyramid under public/tiles for --pack-tiles.
+
+    Returns the packed level directories and the gallery `tiles` paths
+    of the images that have packs.
+    """
+    tiles_dir = PUBLIC_DIR / 'tiles'
+    packed_levels = []
+    packed_images = set()
+    if tiles_dir.exists():
+        for dzi_path in sorted(tiles_dir.glob('*/*.dzi')):
+            levels = pack_pyramid(dzi_path)
+            if levels:
+                packed_levels.extend(levels)
+                packed_images.add(f"tiles/{dzi_path.parent.name}")
+    return frozenset(packed_levels), packed_images
+
+def mark_packed_tiles(packed_images: set) -> bool:
+    """Record in gallery.json which images the viewer reads from packs.
+
+    Sets tilesPacked on images whose tiles were packed in this run and
+    clears it everywhere else, so a run without --pack-tiles points the
+    viewer back at the individual tiles. The file is only rewritten when
+    a flag changes; returns whether it was.
+    """
+    gallery_json = PUBLIC_DIR / 'data' / 'gallery.json'
+    if not gallery_json.exists():
+        return False
+    gallery = json.loads(gallery_json.read_text(encoding='utf-8'))
+
+    changed = False
+    for image in gallery.get('images', []):
+        packed = image.get('tiles') in packed_images
+        if packed != image.get('tilesPacked', False):
+            if packed:
+                image['tilesPacked'] = True
+            else:
+                del image['tilesPacked']
+            changed = True
+    if not changed:
+        return False
+
+    # Same layout as process_images.py: compact plus an indented copy
+    with open(gallery_json, 'w', encoding='utf-8') as f:
+        json.dump(gallery, f, separators=(',', ':'), ensure_ascii=False)
+    with open(gallery_json.with_name('gallery.pretty.json'), 'w', encoding='utf-8') as f:
+        json.dump(gallery, f, indent=2, ensure_ascii=False)
+    return True
+
+def finish_packed_tiles(packed_images: set, failed_keys: list,
+                        transfer_config: TransferConfig) -> None:
+    """Flag packed images in gallery.json once their packs are in the bucket.
+
+    Runs after the upload, so the manifest never sends the viewer to packs
+    that were not uploaded: an image whose .pack or .idx failed keeps
+    reading individual tiles. If a flag changed, gallery.json is uploaded
+    again.
+    """
+    # Pack keys are tiles/<id>/..., matching the gallery `tiles` paths
+    failed = {
+        '/'.join(key.split('/', 2)[:2])
+        for key in failed_keys if key.endswith(PACK_SUFFIXES)
+    }
+    if not mark_packed_tiles(packed_images - failed):
+        return
+
+    gallery_json = PUBLIC_DIR / 'data' / 'gallery.json'
+    result = upload_file(str(gallery_json), 'data/gallery.json', gallery_json.stat().st_size,
+                         *UPLOAD_HEADERS['.json'], transfer_config)
+    if not result['success']:
+        print(f"FAILED: {result['key']}: {result['error']}")
+
+def collect_files(exclude: frozenset = frozenset(), include_packs: bool = False) -> list:
+    """Collect all files to upload.
+
+    Returns (path, key, size, content_type, cache_control) tuples, so the
+    upload workers get their headers without any per-file lookups.
+    Directories in exclude (tile levels uploaded as packs) are skipped,
+    as are .pack/.idx files left by earlier runs unless include_packs.
+    """
     files = []
+    # Keys are the paths relative to public/, sliced off the walked path
+    # strings rather than computed with Path.relative_to per file
+    prefix_len = len(str(PUBLIC_DIR)) + 1
 
     for dir_name in UPLOAD_DIRS:
         dir_path = PUBLIC_DIR / dir_name
         if not dir_path.exists():
             print(f"Warning: {dir_name}/ directory not found, skipping...")
             continue
-
-        for filepath in dir_path.rglob('*'):
-            if filepath.is_file():
-                # Create the R2 key (relative path from public/)
-                key = str(filepath.relative_to(PUBLIC_DIR)).replace('\\', '/')
-                files.append((filepath, key))
+        dir_cache_control = DIR_CACHE_CONTROL.get(dir_name)
+
+        for path, size in iter_files(dir_path, exclude):
+            # Create the R2 key (relative path from public/)
+            key = path[prefix_len:]
+            if os.sep != '/':
+                key = key.replace(os.sep, '/')
+            suffix = os.path.splitext(path)[1].lower()
+            if suffix in PACK_SUFFIXES and not include_packs:
+                continue
+            content_type, cache_control = UPLOAD_HEADERS.get(suffix, DEFAULT_HEADERS)
+            if dir_cache_control:
+                cache_control = dir_cache_control
+            files.append((path, key, size, content_type, cache_control))
 
     # Also upload gallery.json
     gallery_json = PUBLIC_DIR / 'data' / 'gallery.json'
     if gallery_json.exists():
-        files.append((gallery_json, 'data/gallery.json'))
+        files.append((str(gallery_json), 'data/gallery.json', gallery_json.stat().st_size, *UPLOAD_HEADERS['.json']))
 
     return files
 
+def order_uploads(files: list) -> list:
+    """Order uploads largest first, alternating between top-level folders.
+
+    Long master uploads start while the pools are still full rather than
+    straggling at the end, and consecutive requests are spread across
+    key prefixes. The gallery manifest (data/) still goes last, after
+    the assets it points to.
+    """
+    by_dir = {}
+    for f in sorted(files, key=lambda f: f[2], reverse=True):
+        by_dir.setdefault(f[1].split('/', 1)[0], []).append(f)
+    manifest = by_dir.pop('data', [])
+
+    ordered = [f for group in zip_longest(*by_dir.values()) for f in group if f is not None]
+    return ordered + manifest
+
+def report_result(result: dict, stats: dict) -> None:
+    """Tally one upload result; failures are printed right away."""
+    stats['last_key'] = result['key']
+    if result['success']:
+        stats['uploaded'] += 1
+        stats['uploaded_size'] += result['size']
+    else:
+        stats['failed'] += 1
+        stats['failed_keys'].append(result['key'])
+        print(f"\nFAILED: {result['key']}: {result['error']}")
+
+def print_progress(total: int, stats: dict) -> None:
+    """Print the progress line from the current tallies."""
+    done = stats['uploaded'] + stats['failed']
+    progress = done / total * 100
+    print(f"\r[{progress:5.1f}%] {done}/{total} - {stats['last_key'][:50]:<50}", end='', flush=True)
+
+@contextmanager
+def show_progress(total: int, stats: dict, interval: float = 1.0):
+    """Print the progress line every `interval` seconds from a background thread.
+
+    Uploads only update the counters in stats, so no upload path waits
+    on the terminal.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            print_progress(total, stats)
+
+    reporter = threading.Thread(target=run, daemon=True)
+    reporter.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        reporter.join()
+        print_progress(total, stats)
+
+def upload_bounded(files: list, lanes: list, route, stats: dict) -> None:
+    """Submit uploads to one or more pools, each with its own bound.
+
+    lanes holds a (submit, max_pending) pair per pool, where
+    submit(filepath, key, size, content_type, cache_control) returns a
+    future; route(size) gives the lane index for a file. Each lane keeps
+    its own backlog in file order and is topped up as its uploads
+    finish, so a slow lane full of masters never holds up small files.
+    Finished uploads are tallied from this thread.
+    """
+    backlogs = [deque() for _ in lanes]
+    for file in files:
+        backlogs[route(file[2])].append(file)
+    pending = [0] * len(lanes)
+    done = queue.Queue()
+
+    def fill(lane):
+        submit, max_pending = lanes[lane]
+        while backlogs[lane] and pending[lane] < max_pending:
+            future = submit(*backlogs[lane].popleft())
+            pending[lane] += 1
+            future.add_done_callback(lambda f, lane=lane: done.put((lane, f)))
+
+    for lane in range(len(lanes)):
+        fill(lane)
+
+    for _ in range(len(files)):
+        lane, future = done.get()
+        pending[lane] -= 1
+        report_result(future.result(), stats)
+        fill(lane)
+
+def upload_threaded(files: list, transfer_config: TransferConfig, stats: dict) -> None:
+    """Upload files from thread pools sharing one boto3 client."""
+    # Separate thread pools so thousands of small tile PUTs are not queued
+    # behind a few large masters. Small PUTs are latency-bound and need many
+    # threads; large files already upload their parts in parallel.
+    with ThreadPoolExecutor(max_workers=SMALL_FILE_WORKERS) as small_pool, \
+         ThreadPoolExecutor(max_workers=LARGE_FILE_WORKERS) as large_pool:
+        def submitter(pool):
+            def submit(filepath, key, size, content_type, cache_control):
+                return pool.submit(upload_file, filepath, key, size, content_type, cache_control, transfer_config)
+            return submit
+
+        lanes = [
+            (submitter(small_pool), PENDING_PER_WORKER * SMALL_FILE_WORKERS),
+            (submitter(large_pool), PENDING_PER_WORKER * LARGE_FILE_WORKERS)
+        ]
+        upload_bounded(files, lanes, lambda size: 0 if size < SMALL_FILE_SIZE else 1, stats)
+
+def upload_processes(files: list, transfer_config: TransferConfig, processes: int,
+                     presigned: bool, stats: dict) -> None:
+    """Upload files from worker processes, each with its own boto3 client.
+
+    MD5 and gzip of request bodies run in parallel across processes
+    instead of contending for one GIL. Workers read their files from
+    disk themselves, so only paths and results cross process boundaries.
+    """
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=init_upload_process,
+        initargs=(max(10, transfer_config.max_request_concurrency), presigned)
+    ) as pool:
+        def submit(filepath, key, size, content_type, cache_control):
+            return pool.submit(upload_file, filepath, key, size, content_type, cache_control, transfer_config)
+
+        upload_bounded(files, [(submit, PENDING_PER_WORKER * processes)], lambda size: 0, stats)
+
+async def upload_async(files: list, transfer_config: TransferConfig, concurrency: int, stats: dict) -> None:
+    """Upload files from one event loop with up to `concurrency` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    session = aioboto3.Session()
+    async with session.client(
+        's3',
+        endpoint_url=R2_ENDPOINT,
+        aws_access_key_id=R2_ACCESS_KEY_ID,
+        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
+        config=client_config(concurrency)
+    ) as s3:
+        # Create the tasks in list order so they queue on the semaphore in
+        # the order_uploads() order; as_completed() would start bare
+        # coroutines in arbitrary set order
+        tasks = [
+            asyncio.create_task(upload_file_async(
+                s3, semaphore, filepath, key, size, content_type, cache_control, transfer_config
+            ))
+            for filepath, key, size, content_type, cache_control in files
+        ]
+        for task in asyncio.as_completed(tasks):
+            report_result(await task, stats)
+
 def main():
+    parser = argparse.ArgumentParser(description='Upload processed images to Cloudflare R2')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Concurrent part uploads per large file; the asyncio uploader '
+             'keeps 4x this many requests in flight (default: 8)'
+    )
+    parser.add_argument(
+        '--sync',
+        action='store_true',
+        help='Upload with thread pools even when aioboto3 is installed'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Upload every file, even those already in the bucket unchanged'
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Upload from N worker processes instead of threads, for runs '
+             'dominated by hashing and compression (default: off)'
+    )
+    parser.add_argument(
+        '--presigned',
+        action='store_true',
+        help='Send single-part uploads as plain HTTP PUTs to presigned URLs, '
+             'skipping boto3 per request (thread pools or --processes only)'
+    )
+    parser.add_argument(
+        '--pack-tiles',
+        action='store_true',
+        help='Upload each tile pyramid level as one .pack file (plus an '
+             'image.idx index) instead of thousands of individual tiles'
+    )
+    args = parser.parse_args()
+
+    # One pooled connection per thread: every small-file worker, plus the
+    # part uploads of each concurrent large file
+    global s3_client, http_pool
+    raise_http_blocksize()
+    s3_client = create_s3_client(
+        max(64, SMALL_FILE_WORKERS + LARGE_FILE_WORKERS * args.workers)
+    )
+    if args.presigned:
+        http_pool = create_http_pool(SMALL_FILE_WORKERS + LARGE_FILE_WORKERS)
+
+    # Small files go up in a single PUT; masters above the threshold are
+    # split into parts that upload concurrently (max_concurrency parts per
+    # file; the chunk size applies to the asyncio uploader, the threaded
+    # paths stream STREAM_PART_SIZE parts)
+    transfer_config = TransferConfig(
+        multipart_threshold=MULTIPART_THRESHOLD,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        max_concurrency=args.workers,
+        max_io_queue=1000,
+        io_chunksize=1024 * 1024,
+        use_threads=True
+    )
+
     print("=" * 60)
     print("Cloudflare R2 Upload Script")
     print("=" * 60)
     print(f"\nBucket: {R2_BUCKET_NAME}")
     print(f"Endpoint: {R2_ENDPOINT}")
 
+    # Pack tile levels so each goes up as one object
+    packed_levels, packed_images = frozenset(), set()
+    if args.pack_tiles:
+        print("\nPacking tile pyramids...")
+        packed_levels, packed_images = pack_tiles()
+        print(f"Packed {len(packed_levels)} tile levels of {len(packed_images)} images")
+
     # Collect files
     print("\nCollecting files to upload...")
-    files = collect_files()
+    files = collect_files(packed_levels, include_packs=args.pack_tiles)
 
     if not files:
         print("No files found to upload!")
         return
 
     # Calculate total size
-    total_size = sum(f[0].stat().st_size for f in files)
+    total_size = sum(f[2] for f in files)
     print(f"Found {len(files)} files ({total_size / (1024*1024*1024):.2f} GB)")
 
     # Group by directory for progress display
     by_dir = {}
-    for filepath, key in files:
-        dir_name = key.split('/')[0]
-        by_dir.setdefault(dir_name, []).append((filepath, key))
+    for f in files:
+        dir_name = f[1].split('/')[0]
+        by_dir.setdefault(dir_name, []).append(f)
 
     print("\nBreakdown:")
     for dir_name, dir_files in by_dir.items():
-        dir_size = sum(f[0].stat().st_size for f in dir_files)
+        dir_size = sum(f[2] for f in dir_files)
         print(f"  {dir_name}/: {len(dir_files)} files ({dir_size / (1024*1024):.1f} MB)")
 
+    # Leave out files the bucket already holds unchanged
+    skipped = 0
+    if not args.force:
+        print("\nChecking bucket for unchanged files...")
+        existing = list_bucket()
+        to_upload = [
+            f for f in files
+            if f[1] not in existing or not is_unchanged(f[0], f[1], f[2], f[3], existing[f[1]])
+        ]
+        skipped = len(files) - len(to_upload)
+        files = to_upload
+        print(f"{skipped} unchanged, {len(files)} to upload")
+
+        if not files:
+            print("Everything is up to date!")
+            finish_packed_tiles(packed_images, [], transfer_config)
+            return
+
+    files = order_uploads(files)
+
     # Confirm upload
     print("\nPress Enter to start upload (Ctrl+C to cancel)...")
     try:
@@ -174,46 +936,29 @@ def main():
 
     # Upload files with progress
     print("\nUploading...")
-    uploaded = 0
-    failed = 0
-    uploaded_size = 0
-
-    # Use thread pool for parallel uploads
-    max_workers = 8  # Parallel upload threads
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(upload_file, filepath, key): (filepath, key)
-            for filepath, key in files
-        }
-
-        for i, future in enumerate(as_completed(futures), 1):
-            filepath, key = futures[future]
-            result = future.result()
-
-            if result['success']:
-                uploaded += 1
-                uploaded_size += result['size']
-                status = "OK"
-            else:
-                failed += 1
-                status = f"FAILED: {result['error']}"
+    stats = {'uploaded': 0, 'skipped': skipped, 'failed': 0, 'failed_keys': [],
+             'uploaded_size': 0, 'last_key': ''}
 
-            # Progress bar
-            progress = i / len(files) * 100
-            print(f"\r[{progress:5.1f}%] {i}/{len(files)} - {key[:50]:<50} [{status}]", end='')
+    with show_progress(len(files), stats):
+        if args.processes > 0:
+            upload_processes(files, transfer_config, args.processes, args.presigned, stats)
+        elif aioboto3 is not None and not (args.sync or args.presigned):
+            asyncio.run(upload_async(files, transfer_config, args.workers * 4, stats))
+        else:
+            upload_threaded(files, transfer_config, stats)
 
-            # Newline for errors
-            if not result['success']:
-                print()
+    # Only now that the packs are in the bucket may the manifest use them
+    finish_packed_tiles(packed_images, stats['failed_keys'], transfer_config)
 
     print("\n")
     print("=" * 60)
     print("Upload Complete!")
     print("=" * 60)
-    print(f"\nSuccessful: {uploaded} files ({uploaded_size / (1024*1024*1024):.2f} GB)")
-    if failed:
-        print(f"Failed: {failed} files")
+    print(f"\nSuccessful: {stats['uploaded']} files ({stats['uploaded_size'] / (1024*1024*1024):.2f} GB)")
+    if stats['skipped']:
+        print(f"Unchanged:  {stats['skipped']} files (already in bucket)")
+    if stats['failed']:
+        print(f"Failed: {stats['failed']} files")
 
     print("\nNext steps:")
     print("1. Get your public R2 URL from Cloudflare dashboard")